@@ -1,17 +1,44 @@
 #!/usr/bin/env python3
 import argparse
 import base64
+import heapq
+import hmac
+import http.client
 import json
+import multiprocessing
 import os
 import re
+import sys
+import threading
 import time
-from collections import defaultdict, deque
+from array import array
+from collections import Counter, OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
 from http import HTTPStatus
 from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
-from urllib.parse import quote, unquote
+from urllib.parse import quote, unquote, urlsplit
 from urllib import error, request
 
+import numpy as np
+
+try:
+    import orjson
+except Exception:
+    orjson = None
+
+try:
+    from numba import njit
+except Exception:
+    njit = None
+
+try:
+    import fitz
+except Exception:
+    fitz = None
+
 try:
     from pypdf import PdfReader
 except Exception:
@@ -22,38 +49,117 @@ OPENAI_API_URL = "https://api.openai.com/v1/chat/completions"
 OPENAI_EMBEDDINGS_URL = "https://api.openai.com/v1/embeddings"
 OPENAI_MODEL_DEFAULT = "gpt-4o-mini"
 OPENAI_MODEL_ALLOWLIST = {"gpt-4o-mini", "gpt-4o"}
+OPENAI_MAX_IDLE_CONNECTIONS = 8
 RATE_WINDOW_SECONDS = 60
 RATE_MAX_REQUESTS = 20
+RATE_MAX_CLIENTS = 10_000
+RATE_SWEEP_SECONDS = 5.0
 MAX_CHAT_BODY_BYTES = 8_000_000
 MAX_ADMIN_BODY_BYTES = 30_000_000
 MAX_ADMIN_UPLOAD_BYTES = 40_000_000
 MAX_FEEDBACK_BODY_BYTES = 60_000
 DEFAULT_PORT = 8000
+HANDLER_THREAD_STACK_BYTES = 1 << 20
+LISTEN_BACKLOG = 128
 BASE_DIR = Path(__file__).resolve().parent
 DEFAULT_MATERIALS_DIR = BASE_DIR / "materials"
 DEFAULT_FEEDBACK_PATH = BASE_DIR / "feedback.jsonl"
 ALLOWED_EXTENSIONS = {".pdf", ".txt", ".md", ".csv"}
+UPLOAD_COPY_BYTES = 1 << 20
+STALE_UPLOAD_PART_SECONDS = 3600
+BASE64_WINDOW_CHARS = 1 << 16
 CHUNK_SIZE = 1400
 CHUNK_OVERLAP = 220
+TEXT_STREAM_THRESHOLD_BYTES = 1 << 20
+TEXT_READ_CHARS = 1 << 18
+BM25_K1 = 1.2
+BM25_B = 0.75
+RANK_CACHE_MAX_TOKENS = 64
+FEEDBACK_CONTEXT_PRELUDE = "Apply these validated correction notes with priority when relevant.\n\n"
+KB_CONTEXT_PRELUDE = (
+    "Use only the class material context below when answering. "
+    "Add at most one short follow-up question only when it is truly needed. "
+    "Vary follow-up wording naturally and do not repeat fixed phrases like '추가로 궁금한 점이 있나요?'.\n\n"
+    "Class material context:\n"
+)
+VAGUE_QUERIES = frozenset({"?", "??", "뭐", "뭔데", "뭐야", "왜", "어떻게", "help"})
+UNCLEAR_RESPONSE_MARKERS = (
+    "질문을 더 구체",
+    "질문을 명확",
+    "다시 설명",
+    "clarify",
+    "more details",
+    "not clear",
+    "could you specify",
+)
+DISCLAIMER_PREFIX = "자료"
+DISCLAIMER_PARTICLES = ("에", "는", "엔")
+# Optional "제공된" before the prefix; capping the whitespace keeps the streaming hold bounded.
+DISCLAIMER_LEAD = "제공된"
+DISCLAIMER_MAX_LEAD_SPACE = 8
+# Endings match word by word, with up to DISCLAIMER_MAX_SUFFIX_SPACE whitespace chars between.
+DISCLAIMER_SUFFIXES = (("포함되어", "있지", "않습니다"), ("확인할", "수", "없습니다"), ("없습니다",))
+DISCLAIMER_MAX_SUFFIX_SPACE = 4
+DISCLAIMER_MAX_GAP = 160
+# Longest possible disclaimer span; streaming holds back this much of the answer's tail.
+DISCLAIMER_HOLD_CHARS = (
+    len(DISCLAIMER_LEAD)
+    + DISCLAIMER_MAX_LEAD_SPACE
+    + len(DISCLAIMER_PREFIX)
+    + 1
+    + DISCLAIMER_MAX_GAP
+    + max(sum(map(len, words)) + (len(words) - 1) * DISCLAIMER_MAX_SUFFIX_SPACE for words in DISCLAIMER_SUFFIXES)
+    + 1
+)
 _max_answer_chars = int(os.environ.get("MAX_ANSWER_CHARS", "0"))
 _default_system_prompt = os.environ.get(
     "DEFAULT_SYSTEM_PROMPT",
     "Answer primarily based on the provided class materials. If the materials are incomplete, continue with a concise, useful answer using reliable external knowledge. Do not use template disclaimers like 'the provided materials do not include information about ...'.",
 ).strip()
 _user_page_password = os.environ.get("USER_PAGE_PASSWORD", "12345678!").strip()
+_user_page_password_bytes = _user_page_password.encode("utf-8")
+_admin_token = os.environ.get("ADMIN_TOKEN", "").strip().encode("utf-8")
+_openai_api_key = os.environ.get("OPENAI_API_KEY", "").strip()
 _feedback_embedding_model = os.environ.get("FEEDBACK_EMBED_MODEL", "text-embedding-3-small").strip() or "text-embedding-3-small"
 try:
     _feedback_similarity_threshold = float(os.environ.get("FEEDBACK_SIMILARITY_THRESHOLD", "0.55"))
 except Exception:
     _feedback_similarity_threshold = 0.55
 
-_request_log = defaultdict(deque)
-_kb_chunks = []
-_kb_files = []
+
+# Immutable; reloads rebind _kb, so a request that reads `kb = _kb` once sees one consistent KB.
+@dataclass(frozen=True, eq=False)
+class KBSnapshot:
+    sources: list[str]
+    texts: list[str]
+    files: list[str]
+    vocab: dict[str, int]
+    post_offsets: np.ndarray
+    post_ids: np.ndarray
+    post_weights: np.ndarray
+
+
+_TOKEN_RE = re.compile(r"\w+")
+_ASCII_NON_WORD = str.maketrans({c: " " for c in map(chr, range(128)) if not (c.isalnum() or c == "_")})
+
+_request_log: OrderedDict[str, list] = OrderedDict()
+_rate_limit_lock = threading.Lock()
+_rate_last_sweep = 0.0
+_kb_cache: dict[str, tuple[int, int, list[str], list[dict[str, int]]]] = {}
+_kb = KBSnapshot(
+    [], [], [], {}, np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+)
+_kb_write_lock = threading.Lock()
+_static_type_cache: dict[str, str] = {}
 _materials_dir = DEFAULT_MATERIALS_DIR
 _feedback_path = DEFAULT_FEEDBACK_PATH
 _feedback_entries = []
+_feedback_postings: dict[str, array] = {}
+_feedback_embeddings: list[list[float]] = []
+_feedback_lock = threading.Lock()
 _query_embedding_cache = {}
+_openai_idle_conns: list[http.client.HTTPSConnection] = []
+_openai_conn_lock = threading.Lock()
 _feedback_embedding_ready = False
 _github_token = os.environ.get("GITHUB_TOKEN", "").strip()
 _github_owner = os.environ.get("GITHUB_OWNER", "").strip()
@@ -62,62 +168,127 @@ _github_branch = os.environ.get("GITHUB_BRANCH", "main").strip() or "main"
 _github_feedback_path = os.environ.get("GITHUB_FEEDBACK_PATH", "class-ai/feedback.jsonl").strip() or "class-ai/feedback.jsonl"
 
 
+if orjson is not None:
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+else:
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+    _json_loads = json.loads
+
+
 def _rate_limit_ok(ip: str) -> bool:
-    now = time.time()
-    q = _request_log[ip]
-    while q and (now - q[0]) > RATE_WINDOW_SECONDS:
-        q.popleft()
-    if len(q) >= RATE_MAX_REQUESTS:
-        return False
-    q.append(now)
-    return True
+    # Per IP, a ring of the last RATE_MAX_REQUESTS accepted timestamps; the next slot is the oldest.
+    global _rate_last_sweep
+    now = time.monotonic()
+    with _rate_limit_lock:
+        if now - _rate_last_sweep >= RATE_SWEEP_SECONDS:
+            _rate_last_sweep = now
+            _sweep_request_log(now)
+        entry = _request_log.get(ip)
+        if entry is None:
+            entry = _request_log[ip] = [array("d", [float("-inf")] * RATE_MAX_REQUESTS), 0]
+            if len(_request_log) > RATE_MAX_CLIENTS:
+                _request_log.popitem(last=False)
+        else:
+            _request_log.move_to_end(ip)
+        ring, idx = entry
+        slot = idx % RATE_MAX_REQUESTS
+        if (now - ring[slot]) <= RATE_WINDOW_SECONDS:
+            return False
+        ring[slot] = now
+        entry[1] = idx + 1
+        return True
+
+
+def _sweep_request_log(now: float) -> None:
+    # A client whose newest request left the window would pass anyway, so it can be dropped.
+    stale = [
+        ip
+        for ip, (ring, idx) in _request_log.items()
+        if (now - ring[(idx - 1) % RATE_MAX_REQUESTS]) > RATE_WINDOW_SECONDS
+    ]
+    for ip in stale:
+        del _request_log[ip]
 
 
 def _tokenize(text: str) -> list[str]:
-    return [t for t in re.split(r"[^\w]+", text.lower()) if t]
+    lowered = text.lower()
+    if lowered.isascii():
+        # Pure-ASCII text: map non-word chars to spaces and split in C, no regex engine.
+        return lowered.translate(_ASCII_NON_WORD).split()
+    return _TOKEN_RE.findall(lowered)
 
 def _is_unclear_user_query(text: str) -> bool:
     s = text.strip()
     if len(s) < 2:
         return True
-    lowered = s.lower()
-    vague = {
-        "?",
-        "??",
-        "뭐",
-        "뭔데",
-        "뭐야",
-        "왜",
-        "어떻게",
-        "help",
-    }
-    return lowered in vague
+    return s.lower() in VAGUE_QUERIES
 
 def _is_unclear_response(text: str) -> bool:
     lowered = text.lower()
-    markers = [
-        "질문을 더 구체",
-        "질문을 명확",
-        "다시 설명",
-        "clarify",
-        "more details",
-        "not clear",
-        "could you specify",
-    ]
-    return any(m in lowered for m in markers)
+    return any(m in lowered for m in UNCLEAR_RESPONSE_MARKERS)
+
+def _disclaimer_suffix_end(text: str, start: int, words: tuple[str, ...]) -> int:
+    first = words[0]
+    limit = start + DISCLAIMER_MAX_GAP + len(first)
+    i = text.find(first, start, limit)
+    while i != -1:
+        end = i + len(first)
+        for word in words[1:]:
+            j = end
+            while j < len(text) and j - end < DISCLAIMER_MAX_SUFFIX_SPACE and text[j].isspace():
+                j += 1
+            if not text.startswith(word, j):
+                break
+            end = j + len(word)
+        else:
+            return end
+        i = text.find(first, i + 1, limit)
+    return -1
 
-def _remove_material_disclaimer(text: str) -> str:
-    # Remove common template disclaimers like:
-    # "제공된 자료에는 ... 정보가 포함되어 있지 않습니다."
-    patterns = [
-        r"제공된\s*자료[에는엔].{0,160}?포함되어\s*있지\s*않습니다\.?",
-        r"자료[에는엔].{0,160}?없습니다\.?",
-        r"제공된\s*자료[에는엔].{0,160}?확인할\s*수\s*없습니다\.?",
-    ]
+
+def _cut_disclaimers(text: str, hold: int = 0) -> tuple[str, int]:
+    # Remove template disclaimers like "제공된 자료에는 ... 포함되어 있지 않습니다."; text before the returned offset is settled.
     cleaned = text
-    for p in patterns:
-        cleaned = re.sub(p, "", cleaned, flags=re.IGNORECASE | re.DOTALL)
-    cleaned = re.sub(r"\n{3,}", "\n\n", cleaned).strip()
+    pos = 0
+    while True:
+        found = cleaned.find(DISCLAIMER_PREFIX, pos)
+        if found == -1:
+            break
+        # The lead is only looked for after `pos`, so settled (possibly streamed) text is never pulled in.
+        start = found
+        while start > pos and found - start < DISCLAIMER_MAX_LEAD_SPACE and cleaned[start - 1].isspace():
+            start -= 1
+        if cleaned.endswith(DISCLAIMER_LEAD, pos, start):
+            start -= len(DISCLAIMER_LEAD)
+        else:
+            start = found
+        if start >= len(cleaned) - hold:
+            break
+        gap_start = found + len(DISCLAIMER_PREFIX) + 1
+        end = -1
+        if cleaned[gap_start - 1:gap_start] in DISCLAIMER_PARTICLES:
+            for words in DISCLAIMER_SUFFIXES:
+                i = _disclaimer_suffix_end(cleaned, gap_start, words)
+                if i != -1 and (end == -1 or i < end):
+                    end = i
+        if end == -1:
+            pos = found + 1
+            continue
+        if cleaned.startswith(".", end):
+            end += 1
+        cleaned = cleaned[:start] + cleaned[end:]
+        pos = start
+    return cleaned, max(pos, len(cleaned) - hold)
+
+
+def _remove_material_disclaimer(text: str) -> str:
+    cleaned, _ = _cut_disclaimers(text)
+    while "\n\n\n" in cleaned:
+        cleaned = cleaned.replace("\n\n\n", "\n\n")
+    cleaned = cleaned.strip()
     if not cleaned:
         return "현재 자료와 일반 지식을 바탕으로 핵심만 간단히 답변드릴게요."
     return cleaned
@@ -142,122 +313,441 @@ def _sanitize_history(history) -> list[dict]:
 
 
 def _chunk_text(text: str) -> list[str]:
+    length = len(text)
+    if length <= CHUNK_SIZE:
+        text = text.strip()
+        return [text] if text else []
+    # The last window is the first one that reaches the end.
+    step = CHUNK_SIZE - CHUNK_OVERLAP
+    chunks = (text[start : start + CHUNK_SIZE].strip() for start in range(0, length - CHUNK_OVERLAP, step))
+    return [chunk for chunk in chunks if chunk]
+
+
+def _chunk_stream(pieces) -> list[str]:
+    # Same windows as _chunk_text("".join(pieces).strip()), buffering only one window past the last start.
+    step = CHUNK_SIZE - CHUNK_OVERLAP
     chunks = []
-    start = 0
-    while start < len(text):
-        end = min(start + CHUNK_SIZE, len(text))
-        chunk = text[start:end].strip()
-        if chunk:
-            chunks.append(chunk)
-        if end == len(text):
-            break
-        start += CHUNK_SIZE - CHUNK_OVERLAP
-    return chunks
-
-
-def _read_pdf_text(path: Path) -> str:
+    buf = ""
+    for piece in pieces:
+        buf = buf + piece if buf else piece.lstrip()
+        # Trailing whitespace may still be stripped at EOF, so it cannot extend a window yet.
+        limit = len(buf.rstrip())
+        start = 0
+        while limit - start > CHUNK_SIZE:
+            chunk = buf[start:start + CHUNK_SIZE].strip()
+            if chunk:
+                chunks.append(chunk)
+            start += step
+        if start:
+            buf = buf[start:]
+    return chunks + _chunk_text(buf.rstrip())
+
+
+def _iter_pdf_text(path: Path):
+    # One page at a time (with the "\n\n" separator); large PDFs are never joined into one string.
+    sep = ""
+    if fitz is not None:
+        # PyMuPDF extracts text in C; much faster than pypdf on large materials.
+        doc = fitz.open(str(path))
+        try:
+            for i, page in enumerate(doc, start=1):
+                text = page.get_text().strip()
+                if text:
+                    yield f"{sep}[Page {i}] {text}"
+                    sep = "\n\n"
+        finally:
+            doc.close()
+        return
     if PdfReader is None:
-        raise RuntimeError("pypdf is not installed. Run: pip install pypdf")
+        raise RuntimeError("PDF support is not installed. Run: pip install pypdf")
     reader = PdfReader(str(path))
-    pages = []
     for i, page in enumerate(reader.pages, start=1):
         text = (page.extract_text() or "").strip()
         if text:
-            pages.append(f"[Page {i}] {text}")
-    return "\n\n".join(pages).strip()
+            yield f"{sep}[Page {i}] {text}"
+            sep = "\n\n"
+
+
+def _iter_text_file(path: Path):
+    with path.open("r", encoding="utf-8", errors="ignore") as f:
+        while piece := f.read(TEXT_READ_CHARS):
+            yield piece
+
+
+def _intern_terms(tfs: list[dict[str, int]]) -> list[dict[str, int]]:
+    # Interned so every chunk's copy of a token shares one str, even when unpickled from the pool.
+    return [{sys.intern(tok): count for tok, count in tf.items()} for tf in tfs]
+
+
+def _term_counts(text: str) -> dict[str, int]:
+    tf = defaultdict(int)
+    for tok in _tokenize(text):
+        tf[tok] += 1
+    return dict(tf)
 
 
 def _read_text_file(path: Path) -> str:
     return path.read_text(encoding="utf-8", errors="ignore").strip()
 
 
-def _load_materials(materials_dir: Path) -> tuple[list[dict], list[str]]:
-    chunks = []
-    files = []
+def _load_file_chunks(path: Path) -> tuple[list[str], list[dict[str, int]], str]:
+    try:
+        if path.suffix.lower() == ".pdf":
+            texts = _chunk_stream(_iter_pdf_text(path))
+        elif path.stat().st_size > TEXT_STREAM_THRESHOLD_BYTES:
+            texts = _chunk_stream(_iter_text_file(path))
+        else:
+            texts = _chunk_text(_read_text_file(path))
+    except Exception as e:
+        return [], [], str(e)
+    return texts, [_term_counts(chunk) for chunk in texts], ""
+
+
+def _kb_from_cache(names) -> tuple[list[str], list[str], list[dict[str, int]], list[str]]:
+    # The KB is kept struct-of-arrays: parallel per-chunk sources/texts/term counts.
+    sources, texts, tfs, files = [], [], [], []
+    for name in names:
+        cached = _kb_cache.get(name)
+        if not cached or not cached[2]:
+            continue
+        files.append(name)
+        sources += [name] * len(cached[2])
+        texts += cached[2]
+        tfs += cached[3]
+    return sources, texts, tfs, files
+
+
+def _load_materials(materials_dir: Path) -> tuple[list[str], list[str], list[dict[str, int]], list[str]]:
     if not materials_dir.exists():
-        return chunks, files
+        return [], [], [], []
 
+    entries = []
+    pending = []
     for path in sorted(materials_dir.glob("*")):
         if not path.is_file():
             continue
-        suffix = path.suffix.lower()
-        if suffix not in ALLOWED_EXTENSIONS:
+        if path.suffix == ".part":
+            # Leftover of an upload that crashed before its os.replace; in-flight ones are younger.
+            if time.time() - path.stat().st_mtime > STALE_UPLOAD_PART_SECONDS:
+                path.unlink(missing_ok=True)
             continue
-        try:
-            text = _read_pdf_text(path) if suffix == ".pdf" else _read_text_file(path)
-        except Exception as e:
-            print(f"[KB] Skip {path.name}: {e}")
+        if path.suffix.lower() not in ALLOWED_EXTENSIONS:
             continue
-        if not text:
+        # Reuse chunks of files whose mtime/size did not change since the last load.
+        stat = path.stat()
+        cached = _kb_cache.get(path.name)
+        if not (cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size):
+            pending.append(path)
+        entries.append((path, stat))
+
+    # CPU-bound and independent per file; on a single core the spawn cost buys nothing.
+    workers = min(len(pending), os.cpu_count() or 1)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as ex:
+            extracted = dict(zip(pending, ex.map(_load_file_chunks, pending)))
+    else:
+        extracted = {path: _load_file_chunks(path) for path in pending}
+
+    for path, stat in entries:
+        if path not in extracted:
+            continue
+        texts, tfs, err = extracted[path]
+        if err:
+            _kb_cache.pop(path.name, None)
+            print(f"[KB] Skip {path.name}: {err}")
             continue
-        files.append(path.name)
-        for chunk in _chunk_text(text):
-            chunks.append({"source": path.name, "text": chunk, "tokens": _tokenize(chunk)})
-    return chunks, files
+        _kb_cache[path.name] = (stat.st_mtime_ns, stat.st_size, texts, _intern_terms(tfs))
+    names = [path.name for path, _ in entries]
+    for name in set(_kb_cache) - set(names):
+        del _kb_cache[name]
+    return _kb_from_cache(names)
+
+
+def _build_kb_index(tfs: list[dict[str, int]]) -> tuple[dict[str, int], np.ndarray, np.ndarray, np.ndarray]:
+    # Token-major postings: token t owns ids/weights[offsets[t]:offsets[t + 1]]; weights are full BM25 terms.
+    vocab = {}
+    plists = []
+    chunk_len = np.zeros(len(tfs), dtype=np.float32)
+    for cid, tf in enumerate(tfs):
+        chunk_len[cid] = sum(tf.values())
+        for tok, count in tf.items():
+            tid = vocab.get(tok)
+            if tid is None:
+                tid = vocab[tok] = len(plists)
+                plists.append([])
+            plists[tid].append((cid, count))
+    offsets = np.zeros(len(plists) + 1, dtype=np.int64)
+    np.cumsum([len(p) for p in plists], out=offsets[1:])
+    total = int(offsets[-1])
+    ids = np.fromiter((cid for p in plists for cid, _ in p), dtype=np.int32, count=total)
+    post_tfs = np.fromiter((tf for p in plists for _, tf in p), dtype=np.float32, count=total)
+    if not total:
+        return vocab, offsets, ids, post_tfs
+    n = len(chunk_len)
+    df = np.diff(offsets).astype(np.float32)
+    idf = np.log1p((n - df + 0.5) / (df + 0.5))
+    norm = BM25_K1 * (1.0 - BM25_B + BM25_B * chunk_len[ids] / chunk_len.mean())
+    weights = (np.repeat(idf, np.diff(offsets)) * (BM25_K1 + 1.0) * post_tfs / (post_tfs + norm)).astype(np.float32)
+    return vocab, offsets, ids, weights
+
+
+def _feedback_entry(obj: dict) -> dict | None:
+    question = str(obj.get("question", "")).strip()
+    correction = str(obj.get("correction", "")).strip()
+    if not question or not correction:
+        return None
+    return {
+        "question": question,
+        "badAnswer": str(obj.get("badAnswer", "")).strip(),
+        "correction": correction,
+        "ts": str(obj.get("ts", "")).strip(),
+    }
+
 
 def _load_feedback(path: Path) -> list[dict]:
     entries = []
     if not path.exists():
         return entries
-    for line in path.read_text(encoding="utf-8", errors="ignore").splitlines():
-        if not line.strip():
-            continue
-        try:
-            obj = json.loads(line)
-        except Exception:
-            continue
-        question = str(obj.get("question", "")).strip()
-        correction = str(obj.get("correction", "")).strip()
-        if not question or not correction:
-            continue
-        entries.append(
-            {
-                "question": question,
-                "badAnswer": str(obj.get("badAnswer", "")).strip(),
-                "correction": correction,
-                "tokens": _tokenize(f"{question} {correction}"),
-                "ts": str(obj.get("ts", "")).strip(),
-            }
-        )
+    # Stream the file record by record instead of reading and splitting it whole.
+    with path.open("r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                obj = _json_loads(line)
+            except Exception:
+                continue
+            entry = _feedback_entry(obj)
+            if entry:
+                entries.append(entry)
     return entries
 
+def _index_feedback_entry(postings: dict[str, array], eid: int, item: dict) -> None:
+    for tok in set(_tokenize(f"{item['question']} {item['correction']}")):
+        plist = postings.get(tok)
+        if plist is None:
+            plist = postings[tok] = array("i")
+        plist.append(eid)
+
+
+def _build_feedback_index(entries: list[dict]) -> dict[str, array]:
+    postings = {}
+    for eid, item in enumerate(entries):
+        _index_feedback_entry(postings, eid, item)
+    return postings
+
+def _b64decode_chunked(data) -> bytearray:
+    # Decodes 4-char-aligned windows into one buffer; no second full-size temporary is needed.
+    out = bytearray()
+    for i in range(0, len(data), BASE64_WINDOW_CHARS):
+        out += base64.b64decode(data[i : i + BASE64_WINDOW_CHARS], validate=True)
+    return out
+
+
+def _split_json_string_field(raw: bytearray, name: str) -> tuple[dict, memoryview] | None:
+    # Returns (object parsed without the value, view of the value bytes), or None if the value has escapes.
+    key = b'"' + name.encode("utf-8") + b'"'
+    pos = 0
+    while (i := raw.find(key, pos)) != -1:
+        pos = i + len(key)
+        j = pos
+        while j < len(raw) and raw[j] in b" \t\r\n":
+            j += 1
+        if j == len(raw) or raw[j] != ord(":"):
+            continue  # A string value that happens to equal the key name.
+        j += 1
+        while j < len(raw) and raw[j] in b" \t\r\n":
+            j += 1
+        if j == len(raw) or raw[j] != ord('"'):
+            return None
+        start = j + 1
+        end = raw.find(b'"', start)
+        if end == -1 or raw.find(b"\\", start, end) != -1:
+            return None
+        view = memoryview(raw)[start:end]
+        sentinel = os.urandom(16).hex()
+        try:
+            rest = _json_loads(raw[:start] + sentinel.encode("ascii") + raw[end:])
+        except ValueError:
+            return None
+        # A random stand-in proves the slice is the top-level value, not a nested or shadowed one.
+        if not isinstance(rest, dict) or rest.get(name) != sentinel:
+            return None
+        rest[name] = ""
+        lo, hi = 0, len(view)
+        while lo < hi and view[lo] in b" \t\r\n":
+            lo += 1
+        while hi > lo and view[hi - 1] in b" \t\r\n":
+            hi -= 1
+        return rest, view[lo:hi]
+    return None
+
 def _append_feedback(path: Path, item: dict) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(item, ensure_ascii=False) + "\n")
+    with path.open("ab") as f:
+        f.write(_json_dumps(item) + b"\n")
+
+
+def _set_kb(sources: list[str], texts: list[str], tfs: list[dict[str, int]], files: list[str]) -> None:
+    global _kb
+    _kb = KBSnapshot(sources, texts, files, *_build_kb_index(tfs))
+    # Cached rankings are keyed on the snapshot; drop them so old indexes can be freed.
+    _rank_chunk_ids.cache_clear()
 
 
 def _reload_kb() -> None:
-    global _kb_chunks, _kb_files
-    _kb_chunks, _kb_files = _load_materials(_materials_dir)
+    with _kb_write_lock:
+        _set_kb(*_load_materials(_materials_dir))
+
+
+def _create_upload_part(out_path: Path):
+    # O_EXCL on a random name gives each upload its own file, with the umask-default mode.
+    tmp_path = out_path.with_name(f"{out_path.name}.{os.urandom(6).hex()}.part")
+    return tmp_path, os.fdopen(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666), "wb")
+
+
+def _update_kb_for_file(path: Path) -> None:
+    # Stat before parsing so chunks are never cached under a newer upload's mtime/size.
+    stat = path.stat()
+    texts, tfs, err = _load_file_chunks(path)
+    with _kb_write_lock:
+        current = path.stat()
+        if (current.st_mtime_ns, current.st_size) != (stat.st_mtime_ns, stat.st_size):
+            return
+        if err:
+            _kb_cache.pop(path.name, None)
+            print(f"[KB] Skip {path.name}: {err}")
+        else:
+            _kb_cache[path.name] = (stat.st_mtime_ns, stat.st_size, texts, _intern_terms(tfs))
+        _set_kb(*_kb_from_cache(sorted(_kb_cache)))
+
 
 def _reload_feedback() -> None:
-    global _feedback_entries, _feedback_embedding_ready, _query_embedding_cache
+    global _feedback_entries, _feedback_postings, _feedback_embeddings, _feedback_embedding_ready, _query_embedding_cache
     _feedback_entries = _load_feedback(_feedback_path)
+    _feedback_postings = _build_feedback_index(_feedback_entries)
+    _feedback_embeddings = []
     _feedback_embedding_ready = False
     _query_embedding_cache = {}
 
 
+def _add_feedback(item: dict) -> None:
+    # Entries are appended before postings, so readers never see a posting for a missing entry.
+    global _feedback_embedding_ready
+    entry = _feedback_entry(item)
+    with _feedback_lock:
+        _append_feedback(_feedback_path, item)
+        if entry is None:
+            return
+        eid = len(_feedback_entries)
+        _feedback_entries.append(entry)
+        _index_feedback_entry(_feedback_postings, eid, entry)
+        # Only the new entry needs an embedding; see _ensure_feedback_embeddings.
+        _feedback_embedding_ready = False
+
+
+def _openai_request(
+    url: str, payload: dict, api_key: str, timeout: float
+) -> tuple[http.client.HTTPSConnection, http.client.HTTPResponse]:
+    # Reuses idle keep-alive connections; the caller hands the connection back via _openai_release.
+    parts = urlsplit(url)
+    body = _json_dumps(payload)
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {api_key}",
+    }
+    with _openai_conn_lock:
+        conn = _openai_idle_conns.pop() if _openai_idle_conns else None
+    reused = conn is not None
+    while True:
+        if conn is None:
+            conn = http.client.HTTPSConnection(parts.hostname, parts.port, timeout=timeout)
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        try:
+            conn.request("POST", parts.path, body=body, headers=headers)
+            return conn, conn.getresponse()
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            conn.close()
+            if not reused:
+                raise
+            # The server dropped an idle connection; retry once on a fresh one.
+            conn, reused = None, False
+        except Exception:
+            conn.close()
+            raise
+
+
+def _openai_release(conn: http.client.HTTPSConnection, resp: http.client.HTTPResponse) -> None:
+    # The response must be fully read before the connection can carry another request.
+    if resp.will_close:
+        conn.close()
+        return
+    with _openai_conn_lock:
+        if len(_openai_idle_conns) < OPENAI_MAX_IDLE_CONNECTIONS:
+            _openai_idle_conns.append(conn)
+            return
+    conn.close()
+
+
+def _openai_post(url: str, payload: dict, api_key: str, timeout: float) -> tuple[int, bytes]:
+    conn, resp = _openai_request(url, payload, api_key, timeout)
+    try:
+        data = resp.read()
+    except Exception:
+        conn.close()
+        raise
+    _openai_release(conn, resp)
+    return resp.status, data
+
+
+def _iter_stream_deltas(resp: http.client.HTTPResponse):
+    # Chat completion server-sent events: "data: {json}" lines, ended by "data: [DONE]".
+    for line in resp:
+        if not line.startswith(b"data:"):
+            continue
+        data = line[5:].strip()
+        if data == b"[DONE]":
+            break
+        try:
+            obj = _json_loads(data)
+        except ValueError:
+            continue
+        choices = obj.get("choices") or [{}]
+        delta = (choices[0].get("delta") or {}).get("content")
+        if delta:
+            yield delta
+
+
+def _finalize_answer(text: str) -> str:
+    text = text.strip()
+    if "The context provided is insufficient to answer your request." in text:
+        text = (
+            "현재 자료 범위에서 확인되는 내용으로 먼저 답변드릴게요. "
+            "원하시면 질문 대상을 조금 더 구체화해 주세요."
+        )
+    text = _remove_material_disclaimer(text)
+    if _is_unclear_response(text):
+        text = "제가 잘 못 알아들었습니다. 다시 질문해 주세요."
+    if _max_answer_chars > 0 and len(text) > _max_answer_chars:
+        text = text[:_max_answer_chars].rstrip()
+    return text or "No response."
+
+
 def _openai_embed_texts(texts: list[str]) -> list[list[float]]:
-    api_key = os.environ.get("OPENAI_API_KEY", "").strip()
+    api_key = _openai_api_key
     if not api_key:
         return []
     payload = {
         "model": _feedback_embedding_model,
         "input": texts,
     }
-    req = request.Request(
-        OPENAI_EMBEDDINGS_URL,
-        data=json.dumps(payload).encode("utf-8"),
-        headers={
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {api_key}",
-        },
-        method="POST",
-    )
     try:
-        with request.urlopen(req, timeout=30) as resp:
-            data = json.loads(resp.read().decode("utf-8"))
+        status, raw = _openai_post(OPENAI_EMBEDDINGS_URL, payload, api_key, timeout=30)
+        if status >= 400:
+            return []
+        data = _json_loads(raw)
     except Exception:
         return []
     rows = data.get("data") or []
@@ -285,19 +775,24 @@ def _cosine_similarity(a: list[float], b: list[float]) -> float:
 
 
 def _ensure_feedback_embeddings() -> bool:
-    global _feedback_embedding_ready
+    global _feedback_embedding_ready, _feedback_embeddings
     if _feedback_embedding_ready:
         return True
-    if not _feedback_entries:
+    # Embed only entries appended since the last successful call.
+    start = len(_feedback_embeddings)
+    missing = _feedback_entries[start:]
+    if not missing:
         _feedback_embedding_ready = True
         return True
-    texts = [f"{item['question']}\n{item['correction']}" for item in _feedback_entries]
+    texts = [f"{item['question']}\n{item['correction']}" for item in missing]
     vectors = _openai_embed_texts(texts)
-    if len(vectors) != len(_feedback_entries):
+    if len(vectors) != len(missing):
         return False
-    for item, vec in zip(_feedback_entries, vectors):
-        item["embedding"] = vec
-    _feedback_embedding_ready = True
+    with _feedback_lock:
+        # A concurrent request may have embedded the same entries meanwhile.
+        if len(_feedback_embeddings) == start:
+            _feedback_embeddings = _feedback_embeddings + vectors
+        _feedback_embedding_ready = len(_feedback_embeddings) == len(_feedback_entries)
     return True
 
 
@@ -340,7 +835,7 @@ def _sync_feedback_to_github() -> tuple[bool, str]:
     get_req = request.Request(get_url, headers=headers, method="GET")
     try:
         with request.urlopen(get_req, timeout=20) as resp:
-            data = json.loads(resp.read().decode("utf-8"))
+            data = _json_loads(resp.read())
             sha = data.get("sha")
     except error.HTTPError as e:
         if e.code != 404:
@@ -359,13 +854,13 @@ def _sync_feedback_to_github() -> tuple[bool, str]:
 
     put_req = request.Request(
         base_url,
-        data=json.dumps(payload).encode("utf-8"),
+        data=_json_dumps(payload),
         headers={**headers, "Content-Type": "application/json"},
         method="PUT",
     )
     try:
         with request.urlopen(put_req, timeout=25) as resp:
-            data = json.loads(resp.read().decode("utf-8"))
+            data = _json_loads(resp.read())
             commit = (data.get("commit") or {}).get("sha", "")[:7]
             return True, f"Synced to GitHub ({commit or 'ok'})"
     except error.HTTPError as e:
@@ -399,7 +894,7 @@ def _restore_feedback_from_github_if_needed() -> tuple[bool, str]:
     req = request.Request(get_url, headers=headers, method="GET")
     try:
         with request.urlopen(req, timeout=20) as resp:
-            data = json.loads(resp.read().decode("utf-8"))
+            data = _json_loads(resp.read())
     except error.HTTPError as e:
         if e.code == 404:
             return False, "No feedback file found in GitHub"
@@ -422,58 +917,88 @@ def _restore_feedback_from_github_if_needed() -> tuple[bool, str]:
     return True, f"Restored feedback from GitHub to {_feedback_path}"
 
 
-def _rank_chunks(query: str, top_k: int = 6) -> list[dict]:
-    if not _kb_chunks:
-        return []
-    q_tokens = set(_tokenize(query))
+def _score_postings(offsets, ids, weights, q_ids, n_chunks: int) -> np.ndarray:
+    # Gather the query tokens' postings and sum them per chunk in one bincount.
+    spans = [slice(offsets[tid], offsets[tid + 1]) for tid in q_ids]
+    return np.bincount(
+        np.concatenate([ids[span] for span in spans]),
+        np.concatenate([weights[span] for span in spans]),
+        minlength=n_chunks,
+    )
+
+
+def _score_postings_loop(offsets, ids, weights, q_ids, n_chunks):
+    scores = np.zeros(n_chunks, dtype=np.float32)
+    for t in range(q_ids.size):
+        tid = q_ids[t]
+        for k in range(offsets[tid], offsets[tid + 1]):
+            scores[ids[k]] += weights[k]
+    return scores
+
+
+# With numba the loop compiles to native code and releases the GIL; otherwise use numpy slices.
+_score_postings_jit = njit(cache=True, nogil=True)(_score_postings_loop) if njit is not None else None
+
+
+def _rank_chunks(kb: KBSnapshot, query: str, top_k: int = 6, q_tokens: frozenset[str] | None = None) -> tuple[int, ...]:
+    if q_tokens is None:
+        q_tokens = frozenset(_tokenize(query))
+    # Only small token sets are memoized; a huge query would otherwise stay pinned in the cache.
+    if len(q_tokens) > RANK_CACHE_MAX_TOKENS:
+        return _rank_chunk_ids.__wrapped__(q_tokens, top_k, kb)
+    return _rank_chunk_ids(q_tokens, top_k, kb)
+
+
+# The snapshot is part of the key (by identity), so cached rankings never outlive their index.
+@lru_cache(maxsize=512)
+def _rank_chunk_ids(q_tokens: frozenset[str], top_k: int, kb: KBSnapshot) -> tuple[int, ...]:
+    if not kb.texts:
+        return ()
+    fallback = tuple(range(min(top_k, len(kb.texts))))
     if not q_tokens:
-        return _kb_chunks[:top_k]
-    scored = []
-    for chunk in _kb_chunks:
-        score = 0
-        for tok in chunk["tokens"]:
-            if tok in q_tokens:
-                score += 1
-        scored.append((score, chunk))
-    scored.sort(key=lambda x: x[0], reverse=True)
-    return [c for s, c in scored[:top_k] if s > 0] or [c for _, c in scored[:top_k]]
-
-
-def _build_context(chunks: list[dict]) -> str:
+        return fallback
+    q_ids = [kb.vocab[tok] for tok in q_tokens & kb.vocab.keys()]
+    if not q_ids:
+        return fallback
+    # BM25 over the inverted index: only postings of query tokens are visited.
+    score = _score_postings_jit or _score_postings
+    scores = score(kb.post_offsets, kb.post_ids, kb.post_weights, np.array(q_ids, dtype=np.int64), len(kb.texts))
+    hits = np.flatnonzero(scores > 0)
+    if hits.size > top_k:
+        hits = hits[np.argpartition(scores[hits], -top_k)[-top_k:]]
+    hits = hits[np.argsort(-scores[hits], kind="stable")]
+    return tuple(hits.tolist()) or fallback
+
+
+def _build_context(kb: KBSnapshot, chunk_ids) -> str:
     return "\n\n".join(
-        f"[Source {i + 1}: {chunk['source']}]\n{chunk['text']}" for i, chunk in enumerate(chunks)
+        f"[Source {i + 1}: {kb.sources[cid]}]\n{kb.texts[cid]}" for i, cid in enumerate(chunk_ids)
     )
 
-def _rank_feedback(query: str, top_k: int = 2) -> list[dict]:
+def _rank_feedback(query: str, top_k: int = 2, q_tokens: frozenset[str] | None = None) -> list[dict]:
     if not _feedback_entries:
         return []
     # 1) Semantic match (embedding) first.
     if _ensure_feedback_embeddings():
         q_vec = _embed_query_cached(query)
         if q_vec:
-            scored = []
-            for item in _feedback_entries:
-                vec = item.get("embedding") or []
-                sim = _cosine_similarity(q_vec, vec)
-                scored.append((sim, item))
-            scored.sort(key=lambda x: x[0], reverse=True)
-            hits = [i for s, i in scored[:top_k] if s >= _feedback_similarity_threshold]
+            scored = ((_cosine_similarity(q_vec, vec), eid) for eid, vec in enumerate(_feedback_embeddings))
+            top = heapq.nlargest(top_k, scored, key=lambda x: x[0])
+            hits = [_feedback_entries[eid] for s, eid in top if s >= _feedback_similarity_threshold]
             if hits:
                 return hits
 
     # 2) Fallback to token overlap when embedding is unavailable or too weak.
-    q_tokens = set(_tokenize(query))
+    if q_tokens is None:
+        q_tokens = frozenset(_tokenize(query))
     if not q_tokens:
         return _feedback_entries[-top_k:]
-    token_scored = []
-    for item in _feedback_entries:
-        score = 0
-        for tok in item["tokens"]:
-            if tok in q_tokens:
-                score += 1
-        token_scored.append((score, item))
-    token_scored.sort(key=lambda x: x[0], reverse=True)
-    return [i for s, i in token_scored[:top_k] if s > 0]
+    # Count shared tokens through the inverted index; ties keep the older entry first.
+    scores = Counter()
+    for tok in q_tokens & _feedback_postings.keys():
+        scores.update(_feedback_postings[tok])
+    top = heapq.nlargest(top_k, scores, key=lambda eid: (scores[eid], -eid))
+    return [_feedback_entries[eid] for eid in top]
 
 
 class AppHandler(SimpleHTTPRequestHandler):
@@ -505,14 +1030,15 @@ class AppHandler(SimpleHTTPRequestHandler):
         if self.path == "/api/kb-status":
             self._send_json(
                 HTTPStatus.OK,
-                {"chunks": len(_kb_chunks), "feedbackCount": len(_feedback_entries)},
+                {"chunks": len(_kb.texts), "feedbackCount": len(_feedback_entries)},
             )
             return
         if self.path == "/api/admin/kb-status":
             if not self._check_admin_token():
                 self._send_json(HTTPStatus.UNAUTHORIZED, {"error": "Unauthorized"})
                 return
-            self._send_json(HTTPStatus.OK, {"files": _kb_files, "chunks": len(_kb_chunks)})
+            kb = _kb
+            self._send_json(HTTPStatus.OK, {"files": kb.files, "chunks": len(kb.texts)})
             return
         if self.path == "/api/admin/config":
             if not self._check_admin_token():
@@ -535,26 +1061,45 @@ class AppHandler(SimpleHTTPRequestHandler):
         super().do_GET()
 
     def _read_json_body(self, max_bytes: int) -> dict:
+        raw_body = self._read_body(max_bytes)
+        try:
+            return _json_loads(raw_body)
+        except ValueError as e:
+            raise ValueError("Invalid JSON") from e
+
+    def _read_body(self, max_bytes: int) -> bytearray:
         content_length = int(self.headers.get("Content-Length", "0"))
         if content_length <= 0 or content_length > max_bytes:
             raise ValueError("Invalid request size")
-        raw_body = self.rfile.read(content_length)
-        try:
-            return json.loads(raw_body.decode("utf-8"))
-        except json.JSONDecodeError as e:
-            raise ValueError("Invalid JSON") from e
+        return self._read_exact(content_length)
+
+    def _read_exact(self, size: int) -> bytearray:
+        # Fill one preallocated buffer instead of building and joining partial reads.
+        buf = bytearray(size)
+        view = memoryview(buf)
+        offset = 0
+        while offset < size:
+            n = self.rfile.readinto(view[offset:])
+            if not n:
+                raise ValueError("Incomplete request body")
+            offset += n
+        return buf
 
     def _check_admin_token(self) -> bool:
-        expected = os.environ.get("ADMIN_TOKEN", "").strip()
-        provided = self.headers.get("X-Admin-Token", "").strip()
-        return bool(expected) and (provided == expected)
+        provided = self.headers.get("X-Admin-Token", "").strip().encode("utf-8")
+        return bool(_admin_token) and hmac.compare_digest(provided, _admin_token)
+
+    def _check_user_password(self) -> bool:
+        if not _user_page_password_bytes:
+            return True
+        provided = self.headers.get("X-User-Password", "").strip().encode("utf-8")
+        return hmac.compare_digest(provided, _user_page_password_bytes)
 
     def _handle_chat(self) -> None:
         if not _rate_limit_ok(self.client_address[0]):
             self._send_json(HTTPStatus.TOO_MANY_REQUESTS, {"error": "Rate limit exceeded"})
             return
-        provided_password = self.headers.get("X-User-Password", "").strip()
-        if _user_page_password and provided_password != _user_page_password:
+        if not self._check_user_password():
             self._send_json(HTTPStatus.UNAUTHORIZED, {"error": "Unauthorized"})
             return
 
@@ -574,6 +1119,7 @@ class AppHandler(SimpleHTTPRequestHandler):
         kb_query = str(kb.get("query", user)).strip() if isinstance(kb, dict) else user
         kb_top_k = int(kb.get("topK", 6)) if isinstance(kb, dict) else 6
         kb_top_k = max(1, min(kb_top_k, 12))
+        stream = payload.get("stream") is True
 
         if not user:
             self._send_json(HTTPStatus.BAD_REQUEST, {"error": "Missing 'user'"})
@@ -586,13 +1132,21 @@ class AppHandler(SimpleHTTPRequestHandler):
             self._send_json(HTTPStatus.BAD_REQUEST, {"error": "Model not allowed"})
             return
 
-        api_key = os.environ.get("OPENAI_API_KEY", "").strip()
+        api_key = _openai_api_key
         if not api_key:
             self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Server missing OPENAI_API_KEY"})
             return
 
-        user_with_context = user
-        feedback_hits = _rank_feedback(user, top_k=2)
+        # Tokenize each query once; the KB query is usually the user message itself.
+        user_tokens = frozenset(_tokenize(user))
+        # Collect the prompt pieces and join once instead of re-concatenating long strings.
+        parts = []
+        snapshot = _kb
+        if kb_enabled and snapshot.texts:
+            kb_tokens = user_tokens if kb_query == user else frozenset(_tokenize(kb_query))
+            top_chunks = _rank_chunks(snapshot, kb_query, top_k=kb_top_k, q_tokens=kb_tokens)
+            parts += [KB_CONTEXT_PRELUDE, _build_context(snapshot, top_chunks), "\n\nRequest:\n"]
+        feedback_hits = _rank_feedback(user, top_k=2, q_tokens=user_tokens)
         if feedback_hits:
             correction_context = "\n\n".join(
                 f"[Correction {idx + 1}]"
@@ -600,21 +1154,9 @@ class AppHandler(SimpleHTTPRequestHandler):
                 f"\nValidated correction: {item['correction']}"
                 for idx, item in enumerate(feedback_hits)
             )
-            user_with_context = (
-                "Apply these validated correction notes with priority when relevant.\n\n"
-                f"{correction_context}\n\n"
-                f"Current request:\n{user}"
-            )
-        if kb_enabled and _kb_chunks:
-            top_chunks = _rank_chunks(kb_query, top_k=kb_top_k)
-            context = _build_context(top_chunks)
-            user_with_context = (
-                "Use only the class material context below when answering. "
-                "Add at most one short follow-up question only when it is truly needed. "
-                "Vary follow-up wording naturally and do not repeat fixed phrases like '추가로 궁금한 점이 있나요?'.\n\n"
-                f"Class material context:\n{context}\n\n"
-                f"Request:\n{user_with_context}"
-            )
+            parts += [FEEDBACK_CONTEXT_PRELUDE, correction_context, "\n\nCurrent request:\n"]
+        parts.append(user)
+        user_with_context = "".join(parts)
 
         user_content = user_with_context
         if image_data_url:
@@ -639,24 +1181,17 @@ class AppHandler(SimpleHTTPRequestHandler):
             "temperature": 0.2,
             "messages": messages,
         }
-
-        req = request.Request(
-            OPENAI_API_URL,
-            data=json.dumps(upstream_payload).encode("utf-8"),
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {api_key}",
-            },
-            method="POST",
-        )
+        if stream:
+            self._stream_chat(upstream_payload, api_key)
+            return
 
         try:
-            with request.urlopen(req, timeout=40) as resp:
-                upstream_data = json.loads(resp.read().decode("utf-8"))
-        except error.HTTPError as e:
-            detail = e.read().decode("utf-8", errors="ignore")
-            self._send_json(e.code, {"error": f"OpenAI error: {detail[:500]}"})
-            return
+            status, raw = _openai_post(OPENAI_API_URL, upstream_payload, api_key, timeout=40)
+            if status >= 400:
+                detail = raw.decode("utf-8", errors="ignore")
+                self._send_json(status, {"error": f"OpenAI error: {detail[:500]}"})
+                return
+            upstream_data = _json_loads(raw)
         except Exception as e:
             self._send_json(HTTPStatus.BAD_GATEWAY, {"error": f"Upstream request failed: {e}"})
             return
@@ -665,23 +1200,60 @@ class AppHandler(SimpleHTTPRequestHandler):
             upstream_data.get("choices", [{}])[0]
             .get("message", {})
             .get("content", "")
-            .strip()
         )
-        if "The context provided is insufficient to answer your request." in text:
-            text = (
-                "현재 자료 범위에서 확인되는 내용으로 먼저 답변드릴게요. "
-                "원하시면 질문 대상을 조금 더 구체화해 주세요."
-            )
-        text = _remove_material_disclaimer(text)
-        if _is_unclear_response(text):
-            text = "제가 잘 못 알아들었습니다. 다시 질문해 주세요."
-        if _max_answer_chars > 0 and len(text) > _max_answer_chars:
-            text = text[:_max_answer_chars].rstrip()
-        self._send_json(HTTPStatus.OK, {"content": text or "No response."})
+        self._send_json(HTTPStatus.OK, {"content": _finalize_answer(text)})
+
+    def _stream_chat(self, upstream_payload: dict, api_key: str) -> None:
+        # NDJSON: {"delta": ...} lines, then {"done": true, "content": ...} with the final text.
+        upstream_payload["stream"] = True
+        try:
+            conn, resp = _openai_request(OPENAI_API_URL, upstream_payload, api_key, timeout=40)
+        except Exception as e:
+            self._send_json(HTTPStatus.BAD_GATEWAY, {"error": f"Upstream request failed: {e}"})
+            return
+        if resp.status >= 400:
+            detail = resp.read().decode("utf-8", errors="ignore")
+            _openai_release(conn, resp)
+            self._send_json(resp.status, {"error": f"OpenAI error: {detail[:500]}"})
+            return
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.close_connection = True
+        parts = []
+        pending = ""
+        sent = 0
+        try:
+            for delta in _iter_stream_deltas(resp):
+                parts.append(delta)
+                pending += delta
+                if len(pending) <= DISCLAIMER_HOLD_CHARS:
+                    continue
+                # Disclaimers starting before the held-back tail are complete, so text before `cut` is final.
+                pending, cut = _cut_disclaimers(pending, DISCLAIMER_HOLD_CHARS)
+                if cut <= 0:
+                    continue
+                piece, pending = pending[:cut], pending[cut:]
+                if _max_answer_chars > 0:
+                    piece = piece[: max(0, _max_answer_chars - sent)]
+                if piece:
+                    self.wfile.write(_json_dumps({"delta": piece}) + b"\n")
+                    sent += len(piece)
+            resp.read()
+            _openai_release(conn, resp)
+        except Exception as e:
+            conn.close()
+            try:
+                self.wfile.write(_json_dumps({"error": f"Upstream request failed: {e}"}) + b"\n")
+            except OSError:
+                pass  # The client went away.
+            return
+        self.wfile.write(_json_dumps({"done": True, "content": _finalize_answer("".join(parts))}) + b"\n")
 
     def _handle_feedback(self) -> None:
-        provided_password = self.headers.get("X-User-Password", "").strip()
-        if _user_page_password and provided_password != _user_page_password:
+        if not self._check_user_password():
             self._send_json(HTTPStatus.UNAUTHORIZED, {"error": "Unauthorized"})
             return
         try:
@@ -707,8 +1279,7 @@ class AppHandler(SimpleHTTPRequestHandler):
             "ts": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
         }
         try:
-            _append_feedback(_feedback_path, item)
-            _reload_feedback()
+            _add_feedback(item)
         except Exception as e:
             self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"Failed to save feedback: {e}"})
             return
@@ -729,13 +1300,23 @@ class AppHandler(SimpleHTTPRequestHandler):
             return
 
         try:
-            payload = self._read_json_body(MAX_ADMIN_BODY_BYTES)
+            raw_body = self._read_body(MAX_ADMIN_BODY_BYTES)
         except ValueError as e:
             self._send_json(HTTPStatus.BAD_REQUEST, {"error": str(e)})
             return
 
+        # Decode the base64 straight from the body bytes; unusual encodings fall back to a full parse.
+        split = _split_json_string_field(raw_body, "contentBase64")
+        if split is not None:
+            payload, content_base64 = split
+        else:
+            try:
+                payload = _json_loads(raw_body)
+            except ValueError:
+                self._send_json(HTTPStatus.BAD_REQUEST, {"error": "Invalid JSON"})
+                return
+            content_base64 = str(payload.get("contentBase64", "")).strip()
         filename = str(payload.get("filename", "")).strip()
-        content_base64 = str(payload.get("contentBase64", "")).strip()
         if not filename or not content_base64:
             self._send_json(HTTPStatus.BAD_REQUEST, {"error": "Missing filename or contentBase64"})
             return
@@ -747,29 +1328,15 @@ class AppHandler(SimpleHTTPRequestHandler):
             return
 
         try:
-            data = base64.b64decode(content_base64, validate=True)
+            data = _b64decode_chunked(content_base64)
         except Exception:
             self._send_json(HTTPStatus.BAD_REQUEST, {"error": "Invalid base64 file content"})
             return
+        del payload, content_base64, split, raw_body
 
         _materials_dir.mkdir(parents=True, exist_ok=True)
         out_path = _materials_dir / safe_name
-        try:
-            out_path.write_bytes(data)
-            _reload_kb()
-        except Exception as e:
-            self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"Failed to save file: {e}"})
-            return
-
-        self._send_json(
-            HTTPStatus.OK,
-            {
-                "ok": True,
-                "saved": safe_name,
-                "files": _kb_files,
-                "chunks": len(_kb_chunks),
-            },
-        )
+        self._store_material(out_path, lambda f: f.write(data) == len(data))
 
     def _handle_admin_upload_binary(self) -> None:
         if not self._check_admin_token():
@@ -788,27 +1355,57 @@ class AppHandler(SimpleHTTPRequestHandler):
             self._send_json(HTTPStatus.BAD_REQUEST, {"error": "Invalid upload size"})
             return
 
-        data = self.rfile.read(content_length)
-        if not data:
-            self._send_json(HTTPStatus.BAD_REQUEST, {"error": "Empty upload"})
-            return
-
         _materials_dir.mkdir(parents=True, exist_ok=True)
         out_path = _materials_dir / safe_name
+
+        def copy_body(f) -> bool:
+            # Streamed through one reused buffer; the upload is never held in memory whole.
+            remaining = content_length
+            buf = memoryview(bytearray(min(UPLOAD_COPY_BYTES, content_length)))
+            while remaining:
+                n = self.rfile.readinto(buf[: min(len(buf), remaining)])
+                if not n:
+                    return False
+                f.write(buf[:n])
+                remaining -= n
+            return True
+
+        self._store_material(out_path, copy_body)
+
+    def _store_material(self, out_path: Path, write) -> None:
+        # write(f) returns False on a short body; the unique temp file is swapped in atomically.
+        tmp_path = None
         try:
-            out_path.write_bytes(data)
-            _reload_kb()
+            tmp_path, f = _create_upload_part(out_path)
+            with f:
+                complete = write(f)
+            if not complete:
+                tmp_path.unlink(missing_ok=True)
+                self._send_json(HTTPStatus.BAD_REQUEST, {"error": "Incomplete upload"})
+                return
+            os.replace(tmp_path, out_path)
         except Exception as e:
+            if tmp_path is not None:
+                tmp_path.unlink(missing_ok=True)
             self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"Failed to save file: {e}"})
             return
+        try:
+            _update_kb_for_file(out_path)
+        except Exception as e:
+            self._send_json(
+                HTTPStatus.INTERNAL_SERVER_ERROR,
+                {"error": f"Saved {out_path.name} but failed to update the knowledge base: {e}"},
+            )
+            return
 
+        kb = _kb
         self._send_json(
             HTTPStatus.OK,
             {
                 "ok": True,
-                "saved": safe_name,
-                "files": _kb_files,
-                "chunks": len(_kb_chunks),
+                "saved": out_path.name,
+                "files": kb.files,
+                "chunks": len(kb.texts),
             },
         )
 
@@ -817,7 +1414,8 @@ class AppHandler(SimpleHTTPRequestHandler):
             self._send_json(HTTPStatus.UNAUTHORIZED, {"error": "Unauthorized"})
             return
         _reload_kb()
-        self._send_json(HTTPStatus.OK, {"ok": True, "files": _kb_files, "chunks": len(_kb_chunks)})
+        kb = _kb
+        self._send_json(HTTPStatus.OK, {"ok": True, "files": kb.files, "chunks": len(kb.texts)})
 
     def _handle_admin_config_update(self) -> None:
         if not self._check_admin_token():
@@ -865,8 +1463,30 @@ class AppHandler(SimpleHTTPRequestHandler):
             },
         )
 
+    def guess_type(self, path) -> str:
+        # The same few static files are served over and over; skip the mimetypes lookup.
+        ctype = _static_type_cache.get(path)
+        if ctype is None:
+            if len(_static_type_cache) >= 512:
+                _static_type_cache.clear()
+            ctype = _static_type_cache[path] = super().guess_type(path)
+        return ctype
+
+    def copyfile(self, source, outputfile) -> None:
+        # sendfile(2) for real files; in-memory bodies (directory listings) have no fd.
+        try:
+            source.fileno()
+        except (AttributeError, OSError):
+            super().copyfile(source, outputfile)
+            return
+        if outputfile is not self.wfile:
+            super().copyfile(source, outputfile)
+            return
+        self.wfile.flush()
+        self.connection.sendfile(source)
+
     def _send_json(self, status: int, payload: dict) -> None:
-        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        body = _json_dumps(payload)
         self.send_response(status)
         self.send_header("Content-Type", "application/json; charset=utf-8")
         self.send_header("Content-Length", str(len(body)))
@@ -891,6 +1511,11 @@ class AppHandler(SimpleHTTPRequestHandler):
         self.wfile.write(body)
 
 
+class AppServer(ThreadingHTTPServer):
+    # socketserver's default backlog of 5 would refuse bursts while chats hold threads upstream.
+    request_queue_size = LISTEN_BACKLOG
+
+
 def main() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument("--host", type=str, default="0.0.0.0")
@@ -911,7 +1536,9 @@ def main() -> None:
     _, restore_msg = _restore_feedback_from_github_if_needed()
     _reload_feedback()
 
-    server = ThreadingHTTPServer((args.host, args.port), AppHandler)
+    # Handler threads mostly block on OpenAI; a 1 MiB stack keeps many in-flight chats cheap.
+    threading.stack_size(HANDLER_THREAD_STACK_BYTES)
+    server = AppServer((args.host, args.port), AppHandler)
     print(f"Serving on http://localhost:{args.port}")
     print("User page: /")
     print("Admin page: /admin.html")
@@ -921,10 +1548,17 @@ def main() -> None:
     print(f"GitHub feedback sync enabled: {bool(_github_token and _github_owner and _github_repo)}")
     print(f"GitHub feedback restore: {restore_msg}")
     print(f"Feedback semantic matching: model={_feedback_embedding_model}, threshold={_feedback_similarity_threshold}")
-    print(f"Knowledge base files: {len(_kb_files)}, chunks: {len(_kb_chunks)}")
+    if fitz is not None:
+        pdf_backend = "pymupdf"
+    elif PdfReader is not None:
+        pdf_backend = "pypdf (optional: pip install pymupdf for faster extraction; AGPL-3.0)"
+    else:
+        pdf_backend = "unavailable"
+    print(f"PDF text extraction: {pdf_backend}")
+    print(f"Knowledge base files: {len(_kb.files)}, chunks: {len(_kb.texts)}")
     print(f"Feedback entries: {len(_feedback_entries)}")
-    if _kb_files:
-        print("Loaded:", ", ".join(_kb_files))
+    if _kb.files:
+        print("Loaded:", ", ".join(_kb.files))
     else:
         print(f"No materials found in '{_materials_dir}'")
     server.serve_forever()
@@ -76,6 +76,7 @@ async function sendQuestion() {
         kb: { enabled: true, query: question, topK: 6 },
         imageDataUrl: imageDataUrlToSend || undefined,
         history: conversationHistory,
+        stream: true,
       }),
     });
 
@@ -84,11 +85,13 @@ async function sendQuestion() {
       throw new Error(`${res.status} ${text}`);
     }
 
-    const json = await res.json();
+    const content = (res.headers.get("Content-Type") || "").includes("ndjson")
+      ? await readChatStream(res, typingNode)
+      : (await res.json()).content;
     pushHistory("user", question);
-    pushHistory("assistant", json.content || "No response.");
+    pushHistory("assistant", content || "No response.");
     removeTyping(typingNode);
-    appendBotMessage(json.content || "No response.", {
+    appendBotMessage(content || "No response.", {
       allowFeedback: true,
       question,
     });
@@ -98,6 +101,53 @@ async function sendQuestion() {
   }
 }
 
+async function readChatStream(res, typingNode) {
+  // NDJSON: {"delta"} lines are shown as they arrive; the final {"done"} line carries
+  // the post-processed answer, which replaces the preview.
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let preview = null;
+  let content = "";
+  try {
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) {
+        break;
+      }
+      buffer += decoder.decode(value, { stream: true });
+      let newline;
+      while ((newline = buffer.indexOf("\n")) !== -1) {
+        const line = buffer.slice(0, newline).trim();
+        buffer = buffer.slice(newline + 1);
+        if (!line) {
+          continue;
+        }
+        const msg = JSON.parse(line);
+        if (msg.error) {
+          throw new Error(msg.error);
+        }
+        if (msg.delta) {
+          if (!preview) {
+            removeTyping(typingNode);
+            preview = appendBotMessage("");
+          }
+          preview.querySelector(".bubble").textContent += msg.delta;
+          scrollToBottom();
+        }
+        if (msg.done) {
+          content = msg.content;
+        }
+      }
+    }
+  } finally {
+    if (preview) {
+      preview.remove();
+    }
+  }
+  return content;
+}
+
 function appendUserMessage(text, imageDataUrl) {
   const row = document.createElement("div");
   row.className = "msg-row user";
@@ -135,6 +185,7 @@ function appendBotMessage(text, options = {}) {
   }
   messagesEl.appendChild(row);
   scrollToBottom();
+  return row;
 }
 
 function appendTyping() {